@@ -1,9 +1,10 @@
 # app_fixed.py
 import time
 import random
+import hashlib
 from io import BytesIO
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
 import pandas as pd
 import streamlit as st
@@ -37,7 +38,7 @@ st.title("🗓️ Availability Form")
 st.markdown(
     """
 <style>
-  .stButton > button { width: 100%; height: 48px; font-size: 16px; }
+  .stButton > button, .stFormSubmitButton > button { width: 100%; height: 48px; font-size: 16px; }
   label[data-baseweb="radio"] { padding: 6px 0; }
   @media (max-width: 520px){
     div[data-testid="column"] { width: 100% !important; flex: 0 0 100% !important; }
@@ -61,6 +62,12 @@ TAB_SERVING = "ServingBase"
 TAB_DEADLINES = "Deadlines"
 TAB_DATES = "ServiceDates"
 
+REQUIRED_COLUMNS = {
+    TAB_SERVING: frozenset({"Director", "Serving Girl"}),
+    TAB_DEADLINES: frozenset({"month", "deadline_local", "timezone"}),
+    TAB_DATES: frozenset({"target_month", "date", "label", "is_service_day"}),
+}
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Secrets helpers
@@ -165,6 +172,13 @@ def ws_get_df(ws) -> pd.DataFrame:
     return pd.DataFrame(rows, columns=header)
 
 
+def strip_str_columns(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """Cast cols to str and strip surrounding whitespace, in one block assignment. Returns df."""
+    cols = sorted(cols)
+    df[cols] = df[cols].astype(str).apply(lambda s: s.str.strip())
+    return df
+
+
 def ws_ensure_header(ws, desired_header: list[str]) -> list[str]:
     header = gs_retry(ws.row_values, 1)
     if not header:
@@ -230,7 +244,8 @@ def clear_caches():
 # ──────────────────────────────────────────────────────────────────────────────
 def get_now_in_tz(tz_name: str) -> datetime:
     if ZoneInfo is None:
-        return datetime.utcnow()
+        # naive UTC, to match the naive deadline from parse_deadline_local
+        return datetime.now(timezone.utc).replace(tzinfo=None)
     return datetime.now(ZoneInfo(tz_name))
 
 
@@ -276,7 +291,8 @@ def required_yes_for_count(n_dates: int) -> int:
 
 
 def yes_count_from_labels(answers: dict, labels: list[str]) -> int:
-    return sum(1 for lbl in labels if str(answers.get(lbl, "")).strip().lower() == "yes")
+    # Radio values are exactly "Yes" / "No" (None until a choice is made)
+    return sum(1 for lbl in labels if answers.get(lbl) == "Yes")
 
 
 def build_human_report(
@@ -311,50 +327,66 @@ def _safe_parse_date_ymd(s: str) -> datetime:
 # ─────────────────────────────────────────────────────────────
 # Load config from Google Sheets
 # ─────────────────────────────────────────────────────────────
+class ConfigError(Exception):
+    """A config tab is missing required columns."""
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_config():
+    """
+    Fetch, validate and clean the config tabs and build the lookups the form needs
+    (director->girls, month->deadline, month->date labels).
+    Cached so widget reruns reuse the result instead of redoing the pandas work.
+    Raises ConfigError if a tab is missing required columns.
+    """
+    tabs = {
+        TAB_SERVING: fetch_serving_df(),
+        TAB_DEADLINES: fetch_deadlines_df(),
+        TAB_DATES: fetch_service_dates_df(),
+    }
+
+    # Validate, keep only the columns the app uses, and clean them
+    for name, df in tabs.items():
+        cols = REQUIRED_COLUMNS[name]
+        miss = cols.difference(df.columns)
+        if miss:
+            raise ConfigError(f"Google Sheet tab '{name}' is missing columns: {', '.join(sorted(miss))}")
+        tabs[name] = strip_str_columns(df[sorted(cols)].copy(), cols)
+
+    serving_base, deadlines_df, service_dates_all = tabs[TAB_SERVING], tabs[TAB_DEADLINES], tabs[TAB_DATES]
+    serving_base = serving_base[(serving_base["Director"] != "") & (serving_base["Serving Girl"] != "")].drop_duplicates()
+    service_dates_all = service_dates_all[service_dates_all["is_service_day"] == "1"]
+
+    # Build director->girls map
+    pairs = serving_base.sort_values(["Director", "Serving Girl"], kind="mergesort")
+    serving_map = {d: tuple(g) for d, g in pairs.groupby("Director", sort=False)["Serving Girl"]}
+    directors = tuple(serving_map)  # already sorted and non-empty
+
+    # month -> (deadline_local, timezone), first row wins
+    first_dl = deadlines_df.drop_duplicates("month", keep="first")
+    deadlines_by_month = dict(zip(first_dl["month"], zip(first_dl["deadline_local"], first_dl["timezone"])))
+
+    # target_month -> service-day labels in date order
+    dates = service_dates_all.assign(_sort=service_dates_all["date"].map(_safe_parse_date_ymd))
+    dates = dates.sort_values("_sort", kind="mergesort")
+    labels_by_month = {m: g.tolist() for m, g in dates.groupby("target_month", sort=False)["label"]}
+
+    return serving_base, deadlines_df, serving_map, directors, deadlines_by_month, labels_by_month
+
+
 try:
-    serving_base = fetch_serving_df()
-    deadlines_df = fetch_deadlines_df()
-    service_dates_all = fetch_service_dates_df()
+    serving_base, deadlines_df, serving_map, directors, deadlines_by_month, labels_by_month = load_config()
+except ConfigError as e:
+    st.error(str(e))
+    st.stop()
 except Exception as e:
     st.error(f"Failed to load config from Google Sheets: {e}")
     st.stop()
 
-# Validate required columns
-for df, name, needed in [
-    (serving_base, "ServingBase", {"Director", "Serving Girl"}),
-    (deadlines_df, "Deadlines", {"month", "deadline_local", "timezone"}),
-    (service_dates_all, "ServiceDates", {"target_month", "date", "label", "is_service_day"}),
-]:
-    miss = needed - set(df.columns)
-    if miss:
-        st.error(f"Google Sheet tab '{name}' is missing columns: {', '.join(sorted(miss))}")
-        st.stop()
-
-# Clean columns
-serving_base["Director"] = serving_base["Director"].astype(str).str.strip()
-serving_base["Serving Girl"] = serving_base["Serving Girl"].astype(str).str.strip()
-serving_base = serving_base[(serving_base["Director"] != "") & (serving_base["Serving Girl"] != "")].drop_duplicates()
-
-deadlines_df["month"] = deadlines_df["month"].astype(str).str.strip()
-deadlines_df["deadline_local"] = deadlines_df["deadline_local"].astype(str).str.strip()
-deadlines_df["timezone"] = deadlines_df["timezone"].astype(str).str.strip()
-
-service_dates_all["target_month"] = service_dates_all["target_month"].astype(str).str.strip()
-service_dates_all["date"] = service_dates_all["date"].astype(str).str.strip()
-service_dates_all["label"] = service_dates_all["label"].astype(str).str.strip()
-service_dates_all["is_service_day"] = service_dates_all["is_service_day"].astype(str).str.strip()
-
-# Build director->girls map
-serving_map = (
-    serving_base.groupby("Director")["Serving Girl"]
-    .apply(lambda s: sorted({x for x in s if x}))
-    .to_dict()
-)
-
 # Base timezone (prefer first row timezone)
 BASE_TZ = "Africa/Johannesburg"
 try:
-    tz0 = str(deadlines_df["timezone"].iloc[0]).strip()
+    tz0 = deadlines_df["timezone"].iloc[0]
     if tz0:
         BASE_TZ = tz0
 except Exception:
@@ -363,13 +395,10 @@ except Exception:
 now_base = get_now_in_tz(BASE_TZ)
 target_month_key = get_target_month_key(now_base)
 
-# Filter service dates for target month
-month_dates = service_dates_all[
-    (service_dates_all["target_month"] == target_month_key)
-    & (service_dates_all["is_service_day"] == "1")
-].copy()
+# Service dates for target month
+date_labels = labels_by_month.get(target_month_key, [])
 
-if month_dates.empty:
+if not date_labels:
     st.markdown(
         f"""
         ## 🔒 This month’s availability form is not open yet.
@@ -381,25 +410,21 @@ if month_dates.empty:
     )
     st.stop()
 
-month_dates["_sort"] = month_dates["date"].map(_safe_parse_date_ymd)
-month_dates = month_dates.sort_values("_sort").drop(columns=["_sort"])
-
-date_labels = month_dates["label"].astype(str).tolist()
 required_yes = required_yes_for_count(len(date_labels))
 
 # Deadline for target month
-def get_deadline_for_target_month(deadlines: pd.DataFrame, month_key: str):
+def get_deadline_for_target_month(deadlines_by_month: dict, month_key: str):
     tz_guess = BASE_TZ
-    match = deadlines[deadlines["month"] == month_key]
-    if match.empty:
+    entry = deadlines_by_month.get(month_key)
+    if entry is None:
         return None, tz_guess
-    row = match.iloc[0]
-    tz_name = str(row["timezone"]).strip() or tz_guess
-    dl = parse_deadline_local(str(row["deadline_local"]).strip(), tz_name)
+    deadline_local, tz_name = entry
+    tz_name = tz_name or tz_guess
+    dl = parse_deadline_local(deadline_local, tz_name)
     return dl, tz_name
 
 
-deadline_dt, deadline_tz = get_deadline_for_target_month(deadlines_df, target_month_key)
+deadline_dt, deadline_tz = get_deadline_for_target_month(deadlines_by_month, target_month_key)
 
 # Closed if missing deadline or past deadline
 is_closed = True
@@ -460,61 +485,51 @@ answers = st.session_state.answers
 # Form UI
 # ─────────────────────────────────────────────────────────────
 st.subheader("Your details")
-directors = sorted([d for d in serving_map.keys() if d])
-answers["Q1"] = st.selectbox("Please select your director’s name", options=[""] + directors, index=0)
+answers["Q1"] = st.selectbox("Please select your director’s name", options=("",) + directors, index=0)
 
 if answers.get("Q1"):
-    girls = serving_map.get(answers["Q1"], [])
-    answers["Q2"] = st.selectbox("Please select your name", options=[""] + girls, index=0)
+    girls = serving_map.get(answers["Q1"], ())
+    answers["Q2"] = st.selectbox("Please select your name", options=("",) + girls, index=0)
 else:
     answers["Q2"] = ""
 
 st.subheader(f"Availability for {target_month_key}")
 
-radio_options = ["Yes", "No"]
-for lbl in date_labels:
-    saved = answers.get(lbl)
-    idx = radio_options.index(saved) if saved in radio_options else None
-    choice = st.radio(
-        f"Are you available {lbl}?",
-        options=radio_options,
-        index=idx,
-        key=f"avail_{target_month_key}_{lbl}",
-        horizontal=False,
-    )
-    answers[lbl] = choice
-
-yes_cnt = yes_count_from_labels(answers, date_labels)
-needs_reason = yes_cnt < required_yes
+# Dates + reason + Submit are batched in a form, so clicking a radio doesn't rerun the script
+with st.form("availability_form"):
+    # The widget key keeps each choice in st.session_state; no copy into answers needed
+    for lbl in date_labels:
+        st.radio(
+            f"Are you available {lbl}?",
+            options=["Yes", "No"],
+            index=None,
+            key=f"avail_{target_month_key}_{lbl}",
+            horizontal=False,
+        )
 
-if needs_reason:
+    # Shown always: the YES count is only known once the form is submitted
     answers["Q_REASON"] = st.text_area(
-        f"Please provide a reason why you cannot serve **{required_yes}** time(s) this month:",
+        f"If you cannot serve **{required_yes}** time(s) this month, please provide a reason:",
         value=answers.get("Q_REASON", ""),
     )
-else:
-    answers["Q_REASON"] = answers.get("Q_REASON", "")
-
-# Review
-st.subheader("Review")
-c1, c2, c3, c4 = st.columns(4)
-with c1:
-    st.metric("Director", answers.get("Q1") or "—")
-with c2:
-    st.metric("Name", answers.get("Q2") or "—")
-with c3:
-    st.metric("Yes count", yes_cnt)
-with c4:
-    st.metric("Required YES", required_yes)
+    st.caption(
+        f"Your YES count is checked when you press Submit. With fewer than {required_yes} YES "
+        "answers, a reason of at least 5 characters is required."
+    )
+
+    # Submit (sticky)
+    st.markdown('<div class="sticky-submit">', unsafe_allow_html=True)
+    submitted = st.form_submit_button("Submit")
+    st.markdown("</div>", unsafe_allow_html=True)
+
+date_answers = {lbl: st.session_state.get(f"avail_{target_month_key}_{lbl}") for lbl in date_labels}
+yes_cnt = yes_count_from_labels(date_answers, date_labels)
+needs_reason = yes_cnt < required_yes
 
 # ─────────────────────────────────────────────────────────────
-# Submit (sticky)
+# Submit
 # ─────────────────────────────────────────────────────────────
 errors = {}
-st.markdown('<div class="sticky-submit">', unsafe_allow_html=True)
-submitted = st.button("Submit")
-st.markdown("</div>", unsafe_allow_html=True)
-
 if submitted:
     # Hard deadline check on submit too
     now_check = get_now_in_tz(deadline_tz)
@@ -545,33 +560,43 @@ if submitted:
         )
         st.stop()
 
-    if not answers.get("Q1"):
+    director = answers.get("Q1") or ""
+    serving_girl = answers.get("Q2") or ""
+    reason = (answers.get("Q_REASON") or "").strip()
+
+    if not director:
         errors["Q1"] = "Please select a director."
-    if not answers.get("Q2"):
+    if not serving_girl:
         errors["Q2"] = "Please select your name."
     if needs_reason:
-        if not answers.get("Q_REASON") or len(str(answers["Q_REASON"]).strip()) < 5:
+        if len(reason) < 5:
             errors["Q_REASON"] = "Please provide a brief reason (at least 5 characters)."
 
     if errors:
         for msg in errors.values():
             st.error(msg)
     else:
-        now = datetime.utcnow().isoformat() + "Z"
+        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        availability = {lbl: date_answers.get(lbl) or "No" for lbl in date_labels}
         row_map = {
             "timestamp": now,
             "Availability month": target_month_key,
-            "Director": answers.get("Q1") or "",
-            "Serving Girl": answers.get("Q2") or "",
-            "Reason": (answers.get("Q_REASON") or "").strip(),
+            "Director": director,
+            "Serving Girl": serving_girl,
+            "Reason": reason,
         }
-        for lbl in date_labels:
-            row_map[lbl] = (answers.get(lbl) or "No").title()
+        row_map.update(availability)
 
         desired_header = ["timestamp", "Availability month", "Director", "Serving Girl", "Reason"] + date_labels
 
         try:
             append_response_row(desired_header, row_map)
+            st.session_state["_last_submitted"] = {
+                "director": director,
+                "name": serving_girl,
+                "yes_count": yes_cnt,
+                "required_yes": required_yes,
+            }
             clear_caches()
             st.success("Submission saved to Google Sheets.")
         except Exception as e:
@@ -579,21 +604,35 @@ if submitted:
 
         report_text = build_human_report(
             target_month_key=target_month_key,
-            director=answers.get("Q1") or "",
-            name=answers.get("Q2") or "",
+            director=director,
+            name=serving_girl,
             date_labels=date_labels,
-            answers=answers,
-            reason=(answers.get("Q_REASON") or "").strip(),
+            answers=availability,
+            reason=reason,
         )
         st.markdown("### 📄 Screenshot-friendly report (text)")
         st.code(report_text, language=None)
         st.download_button(
             "Download report as .txt",
             data=report_text.encode("utf-8"),
-            file_name=f"Availability_{target_month_key}_{(answers.get('Q2') or 'name').replace(' ', '_')}.txt",
+            file_name=f"Availability_{target_month_key}_{(serving_girl or 'name').replace(' ', '_')}.txt",
             mime="text/plain",
         )
 
+# Last submitted: a snapshot saved after a successful append, not the live widgets
+last = st.session_state.get("_last_submitted")
+if last:
+    st.subheader("Last submitted")
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.metric("Director", last["director"] or "—")
+    with c2:
+        st.metric("Name", last["name"] or "—")
+    with c3:
+        st.metric("Yes count", last["yes_count"])
+    with c4:
+        st.metric("Required YES", last["required_yes"])
+
 # ─────────────────────────────────────────────────────────────
 # Admin: exports + non-responders + diagnostics
 # ─────────────────────────────────────────────────────────────
@@ -601,10 +640,8 @@ def compute_nonresponders(serving_base_df: pd.DataFrame, responses_df: pd.DataFr
     if serving_base_df is None or serving_base_df.empty:
         return pd.DataFrame(columns=["Director", "Serving Girl"])
 
-    sb = serving_base_df[["Director", "Serving Girl"]].copy()
-    sb["Director"] = sb["Director"].astype(str).str.strip()
-    sb["Serving Girl"] = sb["Serving Girl"].astype(str).str.strip()
-    sb = sb[(sb["Director"] != "") & (sb["Serving Girl"] != "")].drop_duplicates()
+    # serving_base from load_config() is already cleaned, non-empty and deduplicated
+    sb = serving_base_df[["Director", "Serving Girl"]]
 
     if responses_df is None or responses_df.empty:
         out = sb.copy()
@@ -620,8 +657,7 @@ def compute_nonresponders(serving_base_df: pd.DataFrame, responses_df: pd.DataFr
         resp[ts_col] = ""
     resp.rename(columns={ts_col: "Last submission"}, inplace=True)
 
-    resp["Director"] = resp["Director"].astype(str).str.strip()
-    resp["Serving Girl"] = resp["Serving Girl"].astype(str).str.strip()
+    resp = strip_str_columns(resp, ["Director", "Serving Girl"])
     resp = resp.sort_values("Last submission").drop_duplicates(
         subset=["Director", "Serving Girl"], keep="last"
     )
@@ -632,6 +668,38 @@ def compute_nonresponders(serving_base_df: pd.DataFrame, responses_df: pd.DataFr
     return nonresp.sort_values(["Director", "Serving Girl"]).reset_index(drop=True)
 
 
+@st.cache_data(ttl=30, show_spinner=False, max_entries=4)
+def build_responses_export(_responses_df: pd.DataFrame, content_hash: str) -> tuple[bytes, str, str]:
+    """
+    Serialize responses for download as (data, file_name, mime).
+    Keyed on a digest of the frame's header, rows and row order (the frame itself
+    isn't hashed by Streamlit), so admin reruns reuse the bytes until the tab changes.
+    Falls back to CSV if no Excel engine can write the workbook.
+    """
+    try:
+        out = BytesIO()
+        try:
+            import xlsxwriter  # noqa
+            # no constant_memory: to_excel writes column by column, which that mode silently drops
+            writer = pd.ExcelWriter(out, engine="xlsxwriter")
+        except ImportError:
+            import openpyxl  # noqa
+            writer = pd.ExcelWriter(out, engine="openpyxl")
+        with writer as xw:
+            _responses_df.to_excel(xw, index=False, sheet_name="Responses")
+        return (
+            out.getvalue(),
+            "uKids_availability_responses.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    except Exception:
+        return (
+            _responses_df.to_csv(index=False).encode("utf-8"),
+            "uKids_availability_responses.csv",
+            "text/csv",
+        )
+
+
 with st.expander("Admin"):
     st.caption("Mode: Google Sheets (one sheet, 4 tabs)")
     if not ADMIN_KEY:
@@ -641,6 +709,9 @@ with st.expander("Admin"):
     if ADMIN_KEY and key != ADMIN_KEY:
         if key:
             st.error("Incorrect admin key.")
+    # Everything below hits Sheets and serializes tables, so only run it on request
+    elif not st.checkbox("Load responses and diagnostics", key="_admin_load"):
+        st.caption("Tick the box to load submissions, non-responders and the Sheets check.")
     else:
         st.success("Admin unlocked.")
         try:
@@ -652,34 +723,22 @@ with st.expander("Admin"):
         st.write(f"Total submissions: **{len(responses_df)}**")
         if not responses_df.empty:
             st.dataframe(responses_df, use_container_width=True)
-            try:
-                import openpyxl  # noqa
-                out = BytesIO()
-                with pd.ExcelWriter(out, engine="openpyxl") as xw:
-                    responses_df.to_excel(xw, index=False, sheet_name="Responses")
-                st.download_button(
-                    "Download all responses",
-                    data=out.getvalue(),
-                    file_name="uKids_availability_responses.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
-            except Exception:
-                st.download_button(
-                    "Download all responses",
-                    data=responses_df.to_csv(index=False).encode("utf-8"),
-                    file_name="uKids_availability_responses.csv",
-                    mime="text/csv",
-                )
+            content_hash = hashlib.sha1(
+                pd.util.hash_pandas_object(responses_df, index=True).to_numpy().tobytes()
+                + repr(tuple(responses_df.columns)).encode()
+            ).hexdigest()
+            data, file_name, mime = build_responses_export(responses_df, content_hash)
+            st.download_button("Download all responses", data=data, file_name=file_name, mime=mime)
         else:
             st.warning("No submissions yet.")
 
         st.markdown("### ❌ Non-responders")
         nonresp_df = compute_nonresponders(serving_base, responses_df)
 
-        all_directors = ["All"] + sorted(serving_base["Director"].unique().tolist())
+        all_directors = ("All",) + directors
         sel_dir = st.selectbox("Filter by director", options=all_directors, index=0)
         view_df = nonresp_df if sel_dir == "All" else nonresp_df[nonresp_df["Director"] == sel_dir]
-        total_expected = len(serving_base[["Director", "Serving Girl"]].dropna().drop_duplicates())
+        total_expected = len(serving_base)  # unique, non-empty pairs from load_config
         st.write(
             f"Non-responders shown: **{len(view_df)}**  |  Total expected pairs: **{total_expected}**"
         )